@@ -0,0 +1,155 @@
+import argparse
+import collections.abc
+import concurrent.futures
+import dataclasses
+import pathlib
+import threading
+import time
+import typing
+
+import pulumi.automation as auto
+
+OPERATIONS = ['preview', 'up']
+
+_output_lock = threading.Lock()
+
+
+@dataclasses.dataclass
+class StackResult:
+    stack: str
+    duration: float
+    changes: dict[str, int] = dataclasses.field(default_factory=dict)
+    error: str | None = None
+
+
+def _print_labeled(stack_name: str, line: str) -> None:
+    with _output_lock:
+        print(f'[{stack_name}] {line.rstrip()}', flush=True)
+
+
+def _normalize_changes(changes: collections.abc.Mapping[typing.Any, int] | None) -> dict[str, int]:
+    # preview reports the operation types as enum, up as plain strings; keys are Any as the
+    # mapping types are invariant in their key
+    return {str(getattr(op, 'value', op)): count for op, count in (changes or {}).items()}
+
+
+def run_stack(
+    stack_name: str,
+    operation: str,
+    work_dir: pathlib.Path,
+    env_vars: dict[str, str],
+    program: auto.PulumiFn,
+    create: bool = False,
+) -> StackResult:
+    """
+    Run a preview or update of one stack with the in-process program.
+
+    As the program runs in this process, all stacks share the module level caches, e.g. the snap
+    version lookups. Missing stacks are only created if requested, otherwise a mistyped stack name
+    fails instead of creating a new empty stack.
+    """
+    start = time.monotonic()
+
+    def on_output(line: str) -> None:
+        _print_labeled(stack_name, line)
+
+    try:
+        workspace = auto.LocalWorkspace(
+            work_dir=str(work_dir),
+            program=program,
+            env_vars=env_vars,
+        )
+        if create:
+            stack = auto.Stack.create_or_select(stack_name, workspace)
+        else:
+            stack = auto.Stack.select(stack_name, workspace)
+
+        if operation == 'preview':
+            preview_result = stack.preview(on_output=on_output)
+            changes = _normalize_changes(preview_result.change_summary)
+        else:
+            up_result = stack.up(on_output=on_output)
+            changes = _normalize_changes(up_result.summary.resource_changes)
+    except Exception as e:
+        _print_labeled(stack_name, f'{operation} failed: {e}')
+        error = next(iter(str(e).splitlines()), repr(e))
+        return StackResult(stack_name, time.monotonic() - start, error=error)
+
+    return StackResult(stack_name, time.monotonic() - start, changes)
+
+
+def run_stacks(
+    stack_names: list[str],
+    operation: str,
+    work_dir: pathlib.Path,
+    parallel: int,
+    program: auto.PulumiFn,
+    env_vars: dict[str, str] | None = None,
+    create: bool = False,
+) -> list[StackResult]:
+    with concurrent.futures.ThreadPoolExecutor(max_workers=parallel) as executor:
+        futures = [
+            executor.submit(
+                run_stack, stack_name, operation, work_dir, env_vars or {}, program, create
+            )
+            for stack_name in stack_names
+        ]
+        return [future.result() for future in futures]
+
+
+def format_summary(results: list[StackResult]) -> str:
+    lines = ['Summary:']
+    for result in results:
+        if result.error:
+            outcome = f'failed: {result.error}'
+        else:
+            outcome = ', '.join(f'{op}={count}' for op, count in sorted(result.changes.items()))
+        lines.append(f'  {result.stack:<10} {result.duration:8.1f}s  {outcome}')
+    return '\n'.join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Preview or update several stacks concurrently using the Automation API.'
+    )
+    parser.add_argument('operation', choices=OPERATIONS)
+    parser.add_argument('stacks', nargs='+', metavar='stack')
+    parser.add_argument(
+        '--parallel', type=int, default=2, help='Maximum number of stacks to run concurrently.'
+    )
+    parser.add_argument(
+        '--work-dir',
+        type=pathlib.Path,
+        default=pathlib.Path.cwd(),
+        help='Directory containing Pulumi.yaml and the stack settings.',
+    )
+    parser.add_argument(
+        '--backend-url',
+        help='State backend to use instead of the logged in one, e.g. file://~/.pulumi-local. '
+        'Missing stacks are created in it.',
+    )
+    parser.add_argument(
+        '--create', action='store_true', help='Create stacks which do not exist yet.'
+    )
+    args = parser.parse_args(argv)
+
+    # Imported here as the program pulls in all providers, which the driver itself doesn't need
+    from kubernetes.program import pulumi_program
+
+    env_vars = {'PULUMI_BACKEND_URL': args.backend_url} if args.backend_url else {}
+    results = run_stacks(
+        args.stacks,
+        args.operation,
+        args.work_dir,
+        args.parallel,
+        pulumi_program,
+        env_vars,
+        create=args.create or bool(args.backend_url),
+    )
+    print(format_summary(results))
+
+    return 1 if any(result.error for result in results) else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,163 @@
+import json
+import re
+
+import pulumi as p
+import pulumi_command as command
+import pulumi_kubernetes as k8s
+import pulumi_onepassword as onepassword
+
+from kubernetes.util import ONEPASSWORD_PULUMI_VAULT
+
+SECTION_LABEL = 'secret'
+SECRET_KEYS = ['tls.crt', 'tls.key']
+
+# Errors of the 1Password provider for an item missing in an existing vault, as reported by the
+# op CLI and by 1Password Connect. A missing vault or denied access must not match.
+ITEM_NOT_FOUND_PATTERNS = [
+    re.compile(r'"[^"]*" isn\'t an item in the "[^"]*" vault'),
+    re.compile(r'Found 0 item\(s\) in vault'),
+]
+
+
+def _get_item_title(secret_name: str) -> str:
+    return f'Certificate {p.get_stack()} {secret_name}'
+
+
+def _is_not_found(error: Exception) -> bool:
+    return any(pattern.search(str(error)) for pattern in ITEM_NOT_FOUND_PATTERNS)
+
+
+def _get_secret_manifest(
+    secret_name: str, namespace: str, annotations: dict[str, str], data: dict[str, str]
+) -> dict:
+    return {
+        'apiVersion': 'v1',
+        'kind': 'Secret',
+        'metadata': {'name': secret_name, 'namespace': namespace, 'annotations': annotations},
+        'type': 'kubernetes.io/tls',
+        'data': data,
+    }
+
+
+def _get_restore_script(secret_name: str, namespace: str) -> str:
+    # Any error other than the secret not existing fails the lookup and hence the restore
+    return (
+        'set -e; '
+        f'existing=$(microk8s kubectl get secret {secret_name} --namespace {namespace} '
+        '--ignore-not-found --output name); '
+        'if [ -n "$existing" ]; then '
+        f'echo "Secret {namespace}/{secret_name} exists, not restoring it"; '
+        'else microk8s kubectl create --filename -; fi'
+    )
+
+
+def find_certificate_backup(secret_name: str) -> onepassword.GetItemResult | None:
+    """
+    Look up the backup of the certificate secret in 1Password.
+
+    Only a missing backup is expected, e.g. on the very first deployment of a stack. Any other
+    error, including an ambiguous title, fails the deployment instead of silently issuing a new
+    certificate.
+    """
+    try:
+        return onepassword.get_item(
+            vault=ONEPASSWORD_PULUMI_VAULT,
+            title=_get_item_title(secret_name),
+        )
+    except Exception as e:
+        if not _is_not_found(e):
+            raise
+        p.log.info(
+            f'No backup found for certificate secret {secret_name}, it will be issued anew ({e})'
+        )
+        return None
+
+
+def restore_certificate_secret(
+    secret_name: str,
+    backup_item: onepassword.GetItemResult,
+    namespace: str,
+    annotations: dict[str, str],
+    connection: command.remote.ConnectionArgs,
+    triggers: list,
+    opts: p.ResourceOptions,
+) -> command.remote.Command | None:
+    """
+    Create the certificate secret from its backup, unless it exists already.
+
+    This takes the DNS01 issuance off the critical path of a cluster rebuild, as long as the
+    secret exists before cert-manager reconciles the certificate. The secret is created on the
+    cluster directly instead of being managed as resource, as cert-manager owns the secret of a
+    live cluster and renews it. The command reruns when the triggers change, e.g. the kube config
+    of a rebuilt cluster. The annotations are needed for cert-manager to consider the secret as
+    belonging to the certificate.
+    """
+    fields = {
+        field.label: field.value
+        for section in backup_item.sections or []
+        if section.label == SECTION_LABEL
+        for field in section.fields or []
+    }
+    if not all(key in fields for key in SECRET_KEYS):
+        p.log.warn(f'Incomplete backup of certificate secret {secret_name}, ignoring it')
+        return None
+
+    # values are stored base64 encoded just like in the secret
+    manifest = _get_secret_manifest(
+        secret_name, namespace, annotations, {key: fields[key] for key in SECRET_KEYS}
+    )
+
+    return command.remote.Command(
+        f'{secret_name}-restore',
+        connection=connection,
+        add_previous_output_in_env=False,
+        create=_get_restore_script(secret_name, namespace),
+        stdin=p.Output.secret(json.dumps(manifest)),
+        triggers=triggers,
+        opts=opts,
+    )
+
+
+def backup_certificate_secret(
+    secret_name: str,
+    namespace: p.Input[str],
+    certificate: k8s.apiextensions.CustomResource,
+    backup_item: onepassword.GetItemResult | None,
+    opts: p.ResourceOptions,
+) -> onepassword.Item:
+    """
+    Store the certificate secret issued by cert-manager in 1Password.
+
+    The item is retained when the stack is destroyed. An existing item is adopted instead of
+    creating a second one with the same title which would make the lookup ambiguous.
+    """
+    secret = k8s.core.v1.Secret.get(
+        f'{secret_name}-issued',
+        p.Output.concat(namespace, '/', secret_name),
+        opts=p.ResourceOptions.merge(opts, p.ResourceOptions(depends_on=[certificate])),
+    )
+
+    return onepassword.Item(
+        f'{secret_name}-backup',
+        title=_get_item_title(secret_name),
+        vault=ONEPASSWORD_PULUMI_VAULT,
+        category='secure_note',
+        sections=[
+            {
+                'label': SECTION_LABEL,
+                'fields': [
+                    {
+                        'label': key,
+                        'type': 'CONCEALED',
+                        'value': secret.data.apply(lambda data, key=key: data[key]),
+                    }
+                    for key in SECRET_KEYS
+                ],
+            },
+        ],
+        opts=p.ResourceOptions(
+            retain_on_delete=True,
+            # only acted upon while the item is not part of the stack state yet
+            import_=backup_item.id if backup_item else None,
+        ),
+    )
@@ -34,6 +34,7 @@ def create_certmanager(
             'crds': {
                 'enabled': True,
             },
+            'extraArgs': component_config.cert_manager.dns01.extra_args,
         },
         opts=k8s_opts,
     )
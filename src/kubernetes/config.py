@@ -54,6 +54,29 @@ class TraeficConfig(StrictBaseModel):
     version: str
 
 
+class PrometheusConfig(StrictBaseModel):
+    version: str
+    scrape_interval: str = pydantic.Field(alias='scrape-interval', default='30s')
+    retention: str = '15d'
+    # in GiB
+    storage_size: int = pydantic.Field(alias='storage-size', default=10)
+
+    @property
+    def retention_size(self) -> str:
+        # leave some headroom on the volume for the WAL and compaction, in MB (powers of two for
+        # prometheus) to not round down to zero for small volumes
+        return f'{int(self.storage_size * 1024 * 0.8)}MB'
+
+
+class GrafanaConfig(StrictBaseModel):
+    version: str
+
+
+class MonitoringConfig(StrictBaseModel):
+    prometheus: PrometheusConfig
+    grafana: GrafanaConfig
+
+
 class MicroK8sInstanceConfig(StrictBaseModel):
     name: str
     cores: int
@@ -75,9 +98,32 @@ class MicroK8sConfig(StrictBaseModel):
     version: str
 
 
+class Dns01Config(StrictBaseModel):
+    recursive_nameservers: list[str] = pydantic.Field(
+        alias='recursive-nameservers', default_factory=list
+    )
+    recursive_nameservers_only: bool = pydantic.Field(
+        alias='recursive-nameservers-only', default=False
+    )
+    check_retry_period: str | None = pydantic.Field(alias='check-retry-period', default=None)
+
+    @property
+    def extra_args(self) -> list[str]:
+        args = []
+        if self.recursive_nameservers:
+            args.append(f'--dns01-recursive-nameservers={",".join(self.recursive_nameservers)}')
+        if self.recursive_nameservers_only:
+            args.append('--dns01-recursive-nameservers-only')
+        if self.check_retry_period:
+            args.append(f'--dns01-check-retry-period={self.check_retry_period}')
+        return args
+
+
 class CertManagerConfig(StrictBaseModel):
     version: str
     use_staging: bool = False
+    dns01: Dns01Config = pydantic.Field(default_factory=Dns01Config)
+    certificate_backup: bool = pydantic.Field(alias='certificate-backup', default=True)
 
     @property
     def issuer_server(self):
@@ -95,6 +141,7 @@ class ComponentConfig(StrictBaseModel):
     microk8s: MicroK8sConfig
     csi_nfs_driver: NfsCsiDriverConfig = pydantic.Field(alias='csi-nfs-driver')
     traefik: TraeficConfig
+    monitoring: MonitoringConfig | None = None
 
 
 class StackConfig(StrictBaseModel):
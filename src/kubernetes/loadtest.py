@@ -0,0 +1,676 @@
+import abc
+import argparse
+import asyncio
+import collections
+import dataclasses
+import json
+import pathlib
+import ssl
+import sys
+import time
+import urllib.parse
+
+import h2.config
+import h2.connection
+import h2.events
+import h2.exceptions
+
+# Values keep this many significant bits, i.e. every power of two is split into 128 linear
+# sub-buckets which bounds the relative error below 1/128 (0.78%)
+SUB_BUCKET_BITS = 8
+SUB_BUCKET_MASK = (1 << SUB_BUCKET_BITS) - 1
+
+PERCENTILES = [50.0, 90.0, 99.0, 99.9]
+
+# Metrics compared against the baseline and whether higher values are better
+COMPARED_METRICS = {
+    'rate': True,
+    'p50': False,
+    'p99': False,
+}
+
+# Settings which must match for a result to be comparable to the baseline
+COMPARED_CONFIG = ['url', 'duration', 'concurrency', 'rate', 'keep_alive', 'http2']
+
+# Statuses of responses without a body
+NO_BODY_STATUSES = (204, 304)
+
+# Default error ratio tolerated regardless of the baseline, which is often free of errors
+MAX_ERROR_RATIO = 0.001
+
+# Pause of a closed-loop worker after a failed request, to not spin on e.g. a refused connection
+ERROR_BACKOFF = 0.1
+
+HTTP2_PREFACE = b'PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n'
+
+RESPONSE_BODY = b'ok\n'
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of latencies in microseconds in the spirit of HdrHistogram.
+
+    Values are bucketed by their power of two and linearly within it, so the relative error of the
+    recorded values is bounded independent of their magnitude.
+    """
+
+    def __init__(self):
+        self.counts: collections.Counter[int] = collections.Counter()
+        self.total = 0
+        self.max = 0
+
+    @staticmethod
+    def _get_index(value: int) -> int:
+        exponent = max(value.bit_length() - SUB_BUCKET_BITS, 0)
+        return (exponent << SUB_BUCKET_BITS) | (value >> exponent)
+
+    @staticmethod
+    def _get_value(index: int) -> int:
+        # highest value that maps to the bucket
+        exponent = index >> SUB_BUCKET_BITS
+        return (((index & SUB_BUCKET_MASK) + 1) << exponent) - 1
+
+    def record(self, value: int) -> None:
+        self.counts[self._get_index(value)] += 1
+        self.total += 1
+        self.max = max(self.max, value)
+
+    def percentile(self, percentile: float) -> int:
+        if not self.total:
+            return 0
+
+        threshold = max(self.total * percentile / 100, 1)
+        cumulative = 0
+        for index in sorted(self.counts):
+            cumulative += self.counts[index]
+            if cumulative >= threshold:
+                return min(self._get_value(index), self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {'counts': {str(index): count for index, count in sorted(self.counts.items())}}
+
+
+@dataclasses.dataclass
+class LoadTestConfig:
+    url: str
+    duration: float = 10.0
+    concurrency: int = 8
+    # Requests per second for an open-loop test, None sends requests back to back
+    rate: float | None = None
+    keep_alive: bool = True
+    http2: bool = False
+    insecure: bool = False
+    # Address to connect to instead of resolving the host, e.g. the ingress IP
+    connect_address: str | None = None
+    timeout: float = 10.0
+
+
+@dataclasses.dataclass
+class _Stats:
+    histogram: LatencyHistogram = dataclasses.field(default_factory=LatencyHistogram)
+    status_codes: collections.Counter[int] = dataclasses.field(default_factory=collections.Counter)
+    errors: collections.Counter[str] = dataclasses.field(default_factory=collections.Counter)
+
+
+class _Connection(abc.ABC):
+    """
+    Client connection on top of asyncio streams, sending one request at a time.
+    """
+
+    alpn_protocol = 'http/1.1'
+    # whether the server has to confirm the protocol via ALPN
+    alpn_required = False
+
+    def __init__(self, config: LoadTestConfig):
+        self.config = config
+        self.url = urllib.parse.urlsplit(config.url)
+        self.is_tls = self.url.scheme == 'https'
+        self.port = self.url.port or (443 if self.is_tls else 80)
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+
+        self.path = self.url.path or '/'
+        if self.url.query:
+            self.path += f'?{self.url.query}'
+
+    def _get_ssl_context(self) -> ssl.SSLContext | None:
+        if not self.is_tls:
+            return None
+        context = ssl.create_default_context()
+        if self.config.insecure:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        context.set_alpn_protocols([self.alpn_protocol])
+        return context
+
+    async def _connect(self) -> None:
+        self.reader, self.writer = await asyncio.open_connection(
+            self.config.connect_address or self.url.hostname,
+            self.port,
+            ssl=self._get_ssl_context(),
+            server_hostname=self.url.hostname if self.is_tls else None,
+        )
+        if self.is_tls:
+            protocol = self.writer.get_extra_info('ssl_object').selected_alpn_protocol()
+            if protocol != self.alpn_protocol and (protocol or self.alpn_required):
+                await self.close()
+                raise ConnectionError(
+                    f'Server negotiated {protocol} instead of {self.alpn_protocol}'
+                )
+
+    async def close(self) -> None:
+        if self.writer:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+    def abort(self) -> None:
+        # drop the connection without waiting for the server, which might not respond anymore
+        if self.writer:
+            self.writer.transport.abort()
+        self.reader = self.writer = None
+
+    @abc.abstractmethod
+    async def get(self) -> int:
+        """
+        Send a GET request for the URL and return the status of the response.
+        """
+
+
+class _Http1Connection(_Connection):
+    """
+    Minimal HTTP/1.1 client connection.
+    """
+
+    def __init__(self, config: LoadTestConfig):
+        super().__init__(config)
+        connection = 'keep-alive' if config.keep_alive else 'close'
+        self.request = (
+            f'GET {self.path} HTTP/1.1\r\n'
+            f'Host: {self.url.netloc}\r\n'
+            'User-Agent: kubernetes-loadtest\r\n'
+            f'Connection: {connection}\r\n'
+            '\r\n'
+        ).encode()
+
+    async def _read_head(self) -> tuple[int, dict[str, str]]:
+        assert self.reader
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError('Connection closed by server')
+        status = int(status_line.split()[1])
+
+        headers = {}
+        while (line := await self.reader.readline()) not in (b'\r\n', b'\n', b''):
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return status, headers
+
+    async def _read_body(self, status: int, headers: dict[str, str]) -> None:
+        assert self.reader
+        if status in NO_BODY_STATUSES:
+            return
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    return
+        elif 'content-length' in headers:
+            await self.reader.readexactly(int(headers['content-length']))
+        else:
+            # body is delimited by the server closing the connection
+            await self.reader.read()
+            await self.close()
+
+    async def get(self) -> int:
+        if not self.writer:
+            await self._connect()
+        assert self.reader and self.writer
+
+        self.writer.write(self.request)
+        await self.writer.drain()
+
+        status, headers = await self._read_head()
+        # skip interim responses, they never have a body
+        while 100 <= status < 200:
+            status, headers = await self._read_head()
+        await self._read_body(status, headers)
+
+        if not self.config.keep_alive or headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status
+
+
+class _Http2Connection(_Connection):
+    """
+    HTTP/2 client connection, over TLS negotiated with ALPN, otherwise with prior knowledge.
+    """
+
+    alpn_protocol = 'h2'
+    alpn_required = True
+
+    def __init__(self, config: LoadTestConfig):
+        super().__init__(config)
+        self.h2: h2.connection.H2Connection | None = None
+        self.headers = [
+            (':method', 'GET'),
+            (':scheme', self.url.scheme),
+            (':authority', self.url.netloc),
+            (':path', self.path),
+            ('user-agent', 'kubernetes-loadtest'),
+        ]
+
+    async def _connect(self) -> None:
+        await super()._connect()
+        self.h2 = h2.connection.H2Connection(h2.config.H2Configuration(client_side=True))
+        self.h2.initiate_connection()
+        await self._flush()
+
+    async def _flush(self) -> None:
+        assert self.writer and self.h2
+        self.writer.write(self.h2.data_to_send())
+        await self.writer.drain()
+
+    async def close(self) -> None:
+        self.h2 = None
+        await super().close()
+
+    async def get(self) -> int:
+        if not self.writer:
+            await self._connect()
+        assert self.reader and self.h2
+
+        stream_id = self.h2.get_next_available_stream_id()
+        self.h2.send_headers(stream_id, self.headers, end_stream=True)
+        await self._flush()
+
+        status = None
+        stream_ended = False
+        while not stream_ended:
+            data = await self.reader.read(65536)
+            if not data:
+                raise ConnectionResetError('Connection closed by server')
+
+            for event in self.h2.receive_data(data):
+                if isinstance(event, h2.events.ResponseReceived):
+                    status = next(int(value) for name, value in event.headers if name == b':status')
+                elif isinstance(event, h2.events.DataReceived):
+                    self.h2.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                elif isinstance(event, h2.events.StreamEnded) and event.stream_id == stream_id:
+                    stream_ended = True
+                elif isinstance(event, h2.events.StreamReset) and event.stream_id == stream_id:
+                    raise ConnectionResetError(f'Stream reset with error {event.error_code}')
+                elif isinstance(event, h2.events.ConnectionTerminated):
+                    raise ConnectionResetError('Connection terminated by server')
+            await self._flush()
+
+        if not self.config.keep_alive:
+            await self.close()
+        assert status is not None
+        return status
+
+
+async def _worker(
+    config: LoadTestConfig,
+    stats: _Stats,
+    deadline: float,
+    schedule: asyncio.Queue[float | None] | None,
+) -> None:
+    connection = (_Http2Connection if config.http2 else _Http1Connection)(config)
+    in_flight = False
+    try:
+        while True:
+            if schedule is not None:
+                # Open loop: latency is measured from the intended start to account for queueing
+                # (coordinated omission)
+                intended_start = await schedule.get()
+                if intended_start is None:
+                    return
+            else:
+                intended_start = time.monotonic()
+                if intended_start >= deadline:
+                    return
+
+            # TimeoutError is an OSError as well
+            in_flight = True
+            try:
+                status = await asyncio.wait_for(connection.get(), config.timeout)
+            except (
+                OSError,
+                ValueError,
+                IndexError,
+                asyncio.IncompleteReadError,
+                h2.exceptions.H2Error,
+            ) as e:
+                stats.errors[type(e).__name__] += 1
+                in_flight = False
+                await connection.close()
+                if schedule is None:
+                    await asyncio.sleep(ERROR_BACKOFF)
+                continue
+
+            in_flight = False
+            latency = time.monotonic() - intended_start
+            stats.histogram.record(int(latency * 1_000_000))
+            stats.status_codes[status] += 1
+    except asyncio.CancelledError:
+        # stopped while waiting for a response
+        if in_flight:
+            stats.errors['Cancelled'] += 1
+        connection.abort()
+        raise
+    finally:
+        await connection.close()
+
+
+async def _schedule_requests(
+    rate: float, start: float, deadline: float, schedule: asyncio.Queue[float | None]
+) -> None:
+    interval = 1 / rate
+    intended_start = start
+    while intended_start < deadline:
+        delay = intended_start - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        schedule.put_nowait(intended_start)
+        intended_start += interval
+
+
+async def run_load_test(config: LoadTestConfig) -> dict:
+    """
+    Run a load test and return its result as JSON serializable dict.
+    """
+    stats = _Stats()
+    start = time.monotonic()
+    deadline = start + config.duration
+    schedule: asyncio.Queue[float | None] | None = asyncio.Queue() if config.rate else None
+
+    workers = [
+        asyncio.create_task(_worker(config, stats, deadline, schedule))
+        for _ in range(config.concurrency)
+    ]
+    if config.rate and schedule is not None:
+        await _schedule_requests(config.rate, start, deadline, schedule)
+        # Let the workers drain what has been scheduled, then stop them
+        for _ in workers:
+            schedule.put_nowait(None)
+
+    # A server which stops responding must not stretch the run, give up on the requests still
+    # outstanding once the last one scheduled had its timeout
+    done, pending = await asyncio.wait(
+        workers, timeout=max(deadline + config.timeout - time.monotonic(), 0)
+    )
+    for worker in pending:
+        worker.cancel()
+    if pending:
+        await asyncio.wait(pending)
+    for worker in done:
+        worker.result()
+    elapsed = time.monotonic() - start
+
+    # Requests scheduled but never sent count as errors, otherwise a stalled run looks healthy
+    while schedule is not None and not schedule.empty():
+        if schedule.get_nowait() is not None:
+            stats.errors['Missed'] += 1
+
+    histogram = stats.histogram
+    return {
+        'config': dataclasses.asdict(config),
+        'elapsed': elapsed,
+        'requests': histogram.total,
+        'errors': dict(stats.errors),
+        'status_codes': {str(code): count for code, count in sorted(stats.status_codes.items())},
+        'rate': histogram.total / elapsed,
+        'latency_us': {
+            **{f'p{percentile:g}': histogram.percentile(percentile) for percentile in PERCENTILES},
+            'max': histogram.max,
+        },
+        'histogram': histogram.to_dict(),
+    }
+
+
+def _get_error_ratio(result: dict) -> float:
+    errors = sum(result['errors'].values())
+    attempts = result['requests'] + errors
+    return errors / attempts if attempts else 0.0
+
+
+def get_config_mismatches(baseline: dict, result: dict) -> list[str]:
+    """
+    Return the settings in which a result differs from the baseline.
+    """
+    return [
+        f'{key}: {baseline["config"].get(key)} != {result["config"].get(key)}'
+        for key in COMPARED_CONFIG
+        if baseline['config'].get(key) != result['config'].get(key)
+    ]
+
+
+def compare_results(
+    baseline: dict, result: dict, max_regression: float, max_error_ratio: float = MAX_ERROR_RATIO
+) -> list[str]:
+    """
+    Compare a result against a baseline and return the regressions exceeding the threshold.
+
+    The error ratio may grow relative to the baseline or up to the absolute maximum, whichever
+    is higher. A baseline without successful requests is no valid reference and is rejected.
+    """
+    if not baseline['requests']:
+        raise ValueError('Baseline has no successful requests')
+    if not result['requests']:
+        return ['no request succeeded']
+
+    regressions = []
+    for metric, higher_is_better in COMPARED_METRICS.items():
+        if metric == 'rate':
+            old, new = baseline['rate'], result['rate']
+        else:
+            old, new = baseline['latency_us'][metric], result['latency_us'][metric]
+        if not old:
+            continue
+
+        change = (new - old) / old
+        if (-change if higher_is_better else change) > max_regression:
+            regressions.append(f'{metric}: {old:.1f} -> {new:.1f} ({change:+.1%})')
+
+    old_ratio, new_ratio = _get_error_ratio(baseline), _get_error_ratio(result)
+    if new_ratio > max(old_ratio * (1 + max_regression), max_error_ratio):
+        regressions.append(f'error ratio: {old_ratio:.2%} -> {new_ratio:.2%}')
+    return regressions
+
+
+async def _handle_http2_client(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, data: bytes
+) -> None:
+    connection = h2.connection.H2Connection(
+        h2.config.H2Configuration(client_side=False, header_encoding='utf-8')
+    )
+    connection.initiate_connection()
+
+    while data:
+        for event in connection.receive_data(data):
+            if isinstance(event, h2.events.RequestReceived):
+                connection.send_headers(
+                    event.stream_id,
+                    [
+                        (':status', '200'),
+                        ('content-type', 'text/plain'),
+                        ('content-length', str(len(RESPONSE_BODY))),
+                    ],
+                )
+                connection.send_data(event.stream_id, RESPONSE_BODY, end_stream=True)
+            elif isinstance(event, h2.events.ConnectionTerminated):
+                return
+        writer.write(connection.data_to_send())
+        await writer.drain()
+        data = await reader.read(65536)
+
+
+async def _handle_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request_line = await reader.readline()
+        if request_line and HTTP2_PREFACE.startswith(request_line):
+            # HTTP/2 with prior knowledge
+            preface = request_line + await reader.readexactly(
+                len(HTTP2_PREFACE) - len(request_line)
+            )
+            await _handle_http2_client(reader, writer, preface)
+            return
+
+        while request_line:
+            keep_alive = True
+            while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                if line.lower().startswith(b'connection:') and b'close' in line.lower():
+                    keep_alive = False
+
+            writer.write(
+                b'HTTP/1.1 200 OK\r\n'
+                b'Content-Type: text/plain\r\n'
+                b'Content-Length: %d\r\n'
+                b'\r\n%s' % (len(RESPONSE_BODY), RESPONSE_BODY)
+            )
+            await writer.drain()
+            if not keep_alive:
+                break
+            request_line = await reader.readline()
+    except (ConnectionError, asyncio.IncompleteReadError, h2.exceptions.H2Error):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(host: str, port: int) -> asyncio.Server:
+    """
+    Start a minimal HTTP/1.1 and cleartext HTTP/2 endpoint as local stand-in for the ingress.
+    """
+    return await asyncio.start_server(_handle_client, host, port)
+
+
+async def serve(host: str, port: int) -> None:
+    server = await start_server(host, port)
+    print(f'Serving on http://{host}:{port}/', flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def _format_result(result: dict) -> str:
+    latencies = ', '.join(
+        f'{name}={value / 1000:.2f}ms' for name, value in result['latency_us'].items()
+    )
+    return (
+        f'{result["requests"]} requests in {result["elapsed"]:.1f}s ({result["rate"]:.1f}/s), '
+        f'status codes: {result["status_codes"]}, errors: {result["errors"]}\n'
+        f'latency: {latencies}'
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Load test the ingress.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run a load test against a URL.')
+    run_parser.add_argument('url')
+    run_parser.add_argument('--duration', type=float, default=10.0, help='Duration in seconds.')
+    run_parser.add_argument(
+        '--concurrency', type=int, default=8, help='Number of concurrent connections.'
+    )
+    run_parser.add_argument(
+        '--rate', type=float, help='Requests per second (open loop), default is back to back.'
+    )
+    run_parser.add_argument('--no-keep-alive', action='store_true')
+    run_parser.add_argument(
+        '--http2',
+        action='store_true',
+        help='Use HTTP/2, negotiated via ALPN for https and with prior knowledge for http.',
+    )
+    run_parser.add_argument(
+        '--insecure', action='store_true', help='Skip TLS verification, e.g. for staging certs.'
+    )
+    run_parser.add_argument(
+        '--connect-address', help='Address to connect to instead of resolving the URL host.'
+    )
+    run_parser.add_argument('--timeout', type=float, default=10.0)
+    run_parser.add_argument('--output', type=pathlib.Path, help='Write the result as JSON.')
+    run_parser.add_argument('--baseline', type=pathlib.Path, help='Baseline result to compare.')
+    run_parser.add_argument('--max-regression', type=float, default=0.1)
+    run_parser.add_argument(
+        '--max-error-ratio',
+        type=float,
+        default=MAX_ERROR_RATIO,
+        help='Error ratio tolerated regardless of the baseline.',
+    )
+
+    serve_parser = subparsers.add_parser('serve', help='Serve a local stand-in endpoint.')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8080)
+
+    compare_parser = subparsers.add_parser('compare', help='Compare a result to a baseline.')
+    compare_parser.add_argument('baseline', type=pathlib.Path)
+    compare_parser.add_argument('result', type=pathlib.Path)
+    compare_parser.add_argument('--max-regression', type=float, default=0.1)
+    compare_parser.add_argument(
+        '--max-error-ratio',
+        type=float,
+        default=MAX_ERROR_RATIO,
+        help='Error ratio tolerated regardless of the baseline.',
+    )
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        try:
+            asyncio.run(serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if args.command == 'run':
+        config = LoadTestConfig(
+            url=args.url,
+            duration=args.duration,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            keep_alive=not args.no_keep_alive,
+            http2=args.http2,
+            insecure=args.insecure,
+            connect_address=args.connect_address,
+            timeout=args.timeout,
+        )
+        result = asyncio.run(run_load_test(config))
+        print(_format_result(result))
+        if args.output:
+            args.output.write_text(json.dumps(result, indent=2) + '\n')
+        if not result['requests']:
+            print('No request succeeded', file=sys.stderr)
+            return 1
+        if not args.baseline:
+            return 0
+        baseline = json.loads(args.baseline.read_text())
+    else:
+        baseline = json.loads(args.baseline.read_text())
+        result = json.loads(args.result.read_text())
+
+    mismatches = get_config_mismatches(baseline, result)
+    if mismatches:
+        print('Refusing to compare runs with different settings:', file=sys.stderr)
+        for mismatch in mismatches:
+            print(f'  {mismatch}', file=sys.stderr)
+        return 2
+
+    try:
+        regressions = compare_results(baseline, result, args.max_regression, args.max_error_ratio)
+    except ValueError as e:
+        print(f'Refusing to compare: {e}', file=sys.stderr)
+        return 2
+    for regression in regressions:
+        print(f'Regression {regression}', file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -10,9 +10,10 @@ from kubernetes.certmanager import create_certmanager
 from kubernetes.config import ComponentConfig
 from kubernetes.csi_nfs import create_csi_nfs
 from kubernetes.metallb import create_metallb
+from kubernetes.monitoring import create_monitoring
 from kubernetes.snap import get_snap_version
 from kubernetes.traefik import create_traefik
-from kubernetes.util import stack_is_prod
+from kubernetes.util import ONEPASSWORD_PULUMI_VAULT, stack_is_prod
 
 
 def _get_cloud_config(hostname: str, username: str, ssh_public_key: str) -> str:
@@ -229,7 +230,7 @@ def create_microk8s(
     create_metallb(component_config, k8s_provider)
 
     # Add hostpath storage
-    command.remote.Command(
+    storage = command.remote.Command(
         f'{vm_config.name}-storage',
         connection=connection_args,
         add_previous_output_in_env=False,
@@ -242,7 +243,11 @@ def create_microk8s(
 
     issuer = create_certmanager(component_config, cloudflare_provider, k8s_provider)
 
-    create_traefik(component_config, issuer, k8s_provider)
+    create_traefik(component_config, issuer, k8s_provider, connection_args)
+
+    # Install metrics pipeline and dashboards
+    if component_config.monitoring:
+        create_monitoring(component_config.monitoring, k8s_provider, storage)
 
     # export to kube config with
     # p stack output --show-secrets k8s-master-0-dev-kube-config > ~/.kube/config
@@ -251,7 +256,6 @@ def create_microk8s(
     onepassword.Item(
         's3-pulumi',
         title=f'Kubeconfig {p.get_stack()}',
-        # Pulumi vault
-        vault='mf5hvtoot2hvdylkce6hxdpqmi',
+        vault=ONEPASSWORD_PULUMI_VAULT,
         password=kube_config_command.stdout,
     )
@@ -0,0 +1,345 @@
+import json
+
+import pulumi as p
+import pulumi_kubernetes as k8s
+
+from kubernetes.config import MonitoringConfig
+
+SERVICE_ACCOUNT_DIR = '/var/run/secrets/kubernetes.io/serviceaccount'
+
+# Only the virtio disks of the VMs are of interest
+DISK_SELECTOR = 'device=~"vd.*"'
+
+
+def _get_pod_scrape_config(
+    job_name: str, namespace: str, port_name: str, app_name: str | None = None
+) -> dict:
+    relabel_configs = [
+        {
+            'source_labels': ['__meta_kubernetes_pod_container_port_name'],
+            'action': 'keep',
+            'regex': port_name,
+        },
+    ]
+    if app_name:
+        relabel_configs.append(
+            {
+                'source_labels': ['__meta_kubernetes_pod_label_app_kubernetes_io_name'],
+                'action': 'keep',
+                'regex': app_name,
+            }
+        )
+    relabel_configs += [
+        {'source_labels': ['__meta_kubernetes_pod_name'], 'target_label': 'pod'},
+        {'source_labels': ['__meta_kubernetes_pod_node_name'], 'target_label': 'node'},
+    ]
+
+    return {
+        'job_name': job_name,
+        'kubernetes_sd_configs': [{'role': 'pod', 'namespaces': {'names': [namespace]}}],
+        'relabel_configs': relabel_configs,
+    }
+
+
+def _get_api_scrape_config(job_name: str, role: str, relabel_configs: list[dict]) -> dict:
+    return {
+        'job_name': job_name,
+        'scheme': 'https',
+        'tls_config': {'ca_file': f'{SERVICE_ACCOUNT_DIR}/ca.crt'},
+        'bearer_token_file': f'{SERVICE_ACCOUNT_DIR}/token',
+        'kubernetes_sd_configs': [{'role': role}],
+        'relabel_configs': relabel_configs,
+    }
+
+
+def _get_kubelet_scrape_config(job_name: str, metrics_path: str) -> dict:
+    # Scrape the kubelet through the API server proxy
+    return _get_api_scrape_config(
+        job_name,
+        'node',
+        [
+            {'action': 'labelmap', 'regex': '__meta_kubernetes_node_label_(.+)'},
+            {'source_labels': ['__meta_kubernetes_node_name'], 'target_label': 'node'},
+            {'target_label': '__address__', 'replacement': 'kubernetes.default.svc:443'},
+            {
+                'source_labels': ['__meta_kubernetes_node_name'],
+                'regex': '(.+)',
+                'target_label': '__metrics_path__',
+                'replacement': f'/api/v1/nodes/$1/proxy{metrics_path}',
+            },
+        ],
+    )
+
+
+def _get_scrape_configs(namespace: str) -> list[dict]:
+    return [
+        {'job_name': 'prometheus', 'static_configs': [{'targets': ['localhost:9090']}]},
+        _get_api_scrape_config(
+            'kubernetes-apiservers',
+            'endpoints',
+            [
+                {
+                    'source_labels': [
+                        '__meta_kubernetes_namespace',
+                        '__meta_kubernetes_service_name',
+                        '__meta_kubernetes_endpoint_port_name',
+                    ],
+                    'action': 'keep',
+                    'regex': 'default;kubernetes;https',
+                },
+            ],
+        ),
+        _get_kubelet_scrape_config('kubernetes-nodes', '/metrics'),
+        _get_kubelet_scrape_config('kubernetes-nodes-cadvisor', '/metrics/cadvisor'),
+        _get_pod_scrape_config('node-exporter', namespace, 'metrics', 'prometheus-node-exporter'),
+        _get_pod_scrape_config('kube-state-metrics', namespace, 'http', 'kube-state-metrics'),
+        _get_pod_scrape_config('traefik', 'traefik', 'metrics'),
+        _get_pod_scrape_config('metallb', 'metallb-system', 'monitoring'),
+        _get_pod_scrape_config('cert-manager', 'cert-manager', 'http-metrics'),
+    ]
+
+
+def _get_histogram_quantiles(metric: str, by: str) -> list[tuple[str, str]]:
+    return [
+        (
+            f'histogram_quantile({quantile}, sum by (le, {by}) (rate({metric}[5m])))',
+            f'{{{{{by}}}}} p{int(quantile * 100)}',
+        )
+        for quantile in (0.5, 0.99)
+    ]
+
+
+def _get_dashboard(
+    uid: str, title: str, panels: list[tuple[str, str, list[tuple[str, str]]]]
+) -> dict:
+    """
+    Build a grafana dashboard of time series panels, two per row.
+
+    Each panel is given as title, unit and a list of queries with their legend.
+    """
+    return {
+        'uid': uid,
+        'title': title,
+        'schemaVersion': 39,
+        'refresh': '30s',
+        'time': {'from': 'now-6h', 'to': 'now'},
+        'panels': [
+            {
+                'id': idx + 1,
+                'type': 'timeseries',
+                'title': panel_title,
+                'datasource': {'type': 'prometheus', 'uid': 'prometheus'},
+                'gridPos': {'h': 8, 'w': 12, 'x': (idx % 2) * 12, 'y': (idx // 2) * 8},
+                'fieldConfig': {'defaults': {'unit': unit}, 'overrides': []},
+                'targets': [
+                    {'refId': chr(ord('A') + target_idx), 'expr': expr, 'legendFormat': legend}
+                    for target_idx, (expr, legend) in enumerate(targets)
+                ],
+            }
+            for idx, (panel_title, unit, targets) in enumerate(panels)
+        ],
+    }
+
+
+def _get_ingress_dashboard() -> dict:
+    return _get_dashboard(
+        'ingress',
+        'Ingress',
+        [
+            (
+                'Latency by entrypoint',
+                's',
+                _get_histogram_quantiles(
+                    'traefik_entrypoint_request_duration_seconds_bucket', 'entrypoint'
+                ),
+            ),
+            (
+                'Latency by service',
+                's',
+                _get_histogram_quantiles(
+                    'traefik_service_request_duration_seconds_bucket', 'service'
+                ),
+            ),
+            (
+                'Requests by status code',
+                'reqps',
+                [('sum by (code) (rate(traefik_entrypoint_requests_total[5m]))', '{{code}}')],
+            ),
+            (
+                'Open connections by entrypoint',
+                'short',
+                [('sum by (entrypoint) (traefik_open_connections)', '{{entrypoint}}')],
+            ),
+        ],
+    )
+
+
+def _get_nodes_dashboard() -> dict:
+    cpu_count = 'count by (node) (node_cpu_seconds_total{mode="idle"})'
+    return _get_dashboard(
+        'nodes',
+        'Node saturation',
+        [
+            (
+                'CPU utilization by mode',
+                'percentunit',
+                [
+                    (
+                        'sum by (node, mode) (rate(node_cpu_seconds_total'
+                        '{mode=~"user|system|iowait|steal"}[5m]))'
+                        f' / on (node) group_left {cpu_count}',
+                        '{{node}} {{mode}}',
+                    )
+                ],
+            ),
+            (
+                'CPU steal',
+                'percentunit',
+                [
+                    (
+                        'avg by (node) (rate(node_cpu_seconds_total{mode="steal"}[5m]))',
+                        '{{node}}',
+                    )
+                ],
+            ),
+            (
+                'Load per core',
+                'short',
+                [(f'node_load1 / on (node) {cpu_count}', '{{node}}')],
+            ),
+            (
+                'Memory utilization',
+                'percentunit',
+                [
+                    (
+                        '1 - node_memory_MemAvailable_bytes / node_memory_MemTotal_bytes',
+                        '{{node}}',
+                    )
+                ],
+            ),
+            (
+                'Disk latency',
+                's',
+                [
+                    (
+                        f'rate(node_disk_{op}_time_seconds_total{{{DISK_SELECTOR}}}[5m])'
+                        f' / rate(node_disk_{op}s_completed_total{{{DISK_SELECTOR}}}[5m])',
+                        f'{{{{device}}}} {op}',
+                    )
+                    for op in ('read', 'write')
+                ],
+            ),
+            (
+                'Disk utilization',
+                'percentunit',
+                [
+                    (
+                        f'rate(node_disk_io_time_seconds_total{{{DISK_SELECTOR}}}[5m])',
+                        '{{device}}',
+                    )
+                ],
+            ),
+            (
+                'API server latency',
+                's',
+                _get_histogram_quantiles(
+                    'apiserver_request_duration_seconds_bucket{verb!~"WATCH|CONNECT"}', 'verb'
+                ),
+            ),
+        ],
+    )
+
+
+def create_monitoring(
+    monitoring_config: MonitoringConfig,
+    k8s_provider: k8s.Provider,
+    storage: p.Resource,
+):
+    namespace = k8s.core.v1.Namespace(
+        'monitoring',
+        metadata={'name': 'monitoring'},
+        opts=p.ResourceOptions(provider=k8s_provider),
+    )
+
+    namespaced_k8s_provider = k8s.Provider(
+        'monitoring-provider',
+        kubeconfig=k8s_provider.kubeconfig,  # type: ignore
+        namespace=namespace.metadata['name'],
+    )
+    # Prometheus and Grafana need persistent volumes from the hostpath storage
+    k8s_opts = p.ResourceOptions(provider=namespaced_k8s_provider, depends_on=[storage])
+
+    prometheus_config = monitoring_config.prometheus
+    prometheus = k8s.helm.v3.Release(
+        'prometheus',
+        # Fixed name in order to have a predictable service name for the grafana datasource
+        name='prometheus',
+        chart='prometheus',
+        version=prometheus_config.version,
+        namespace=namespace.metadata.name,
+        repository_opts={'repo': 'https://prometheus-community.github.io/helm-charts'},
+        values={
+            'alertmanager': {'enabled': False},
+            'prometheus-pushgateway': {'enabled': False},
+            'kube-state-metrics': {'enabled': True},
+            'prometheus-node-exporter': {'enabled': True},
+            'server': {
+                'global': {'scrape_interval': prometheus_config.scrape_interval},
+                'retention': prometheus_config.retention,
+                'retentionSize': prometheus_config.retention_size,
+                'persistentVolume': {'size': f'{prometheus_config.storage_size}Gi'},
+            },
+            'serverFiles': {
+                'prometheus.yml': {'scrape_configs': _get_scrape_configs('monitoring')},
+            },
+        },
+        opts=k8s_opts,
+    )
+
+    k8s.helm.v3.Release(
+        'grafana',
+        chart='grafana',
+        version=monitoring_config.grafana.version,
+        namespace=namespace.metadata.name,
+        repository_opts={'repo': 'https://grafana.github.io/helm-charts'},
+        values={
+            'persistence': {'enabled': True, 'size': '1Gi'},
+            'datasources': {
+                'datasources.yaml': {
+                    'apiVersion': 1,
+                    'datasources': [
+                        {
+                            'name': 'Prometheus',
+                            'uid': 'prometheus',
+                            'type': 'prometheus',
+                            'url': 'http://prometheus-server',
+                            'access': 'proxy',
+                            'isDefault': True,
+                        },
+                    ],
+                },
+            },
+            'dashboardProviders': {
+                'dashboardproviders.yaml': {
+                    'apiVersion': 1,
+                    'providers': [
+                        {
+                            'name': 'default',
+                            'orgId': 1,
+                            'folder': '',
+                            'type': 'file',
+                            'disableDeletion': True,
+                            'options': {'path': '/var/lib/grafana/dashboards/default'},
+                        },
+                    ],
+                },
+            },
+            'dashboards': {
+                'default': {
+                    'ingress': {'json': json.dumps(_get_ingress_dashboard())},
+                    'nodes': {'json': json.dumps(_get_nodes_dashboard())},
+                },
+            },
+        },
+        opts=p.ResourceOptions.merge(k8s_opts, p.ResourceOptions(depends_on=[prometheus])),
+    )
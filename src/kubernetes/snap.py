@@ -1,6 +1,11 @@
+import functools
+
 import requests
 
 
+# Cached as the same lookups are repeated within a program and across stacks deployed from one
+# process by the automation driver
+@functools.cache
 def get_snap_version(package: str, channel: str, architecture: str) -> str:
     response = requests.get(
         f' https://api.snapcraft.io/v2/snaps/info/{package}', headers={'Snap-Device-Series': '16'}
@@ -1,7 +1,13 @@
 import deploy_base.opnsense.unbound.host_override
 import pulumi as p
+import pulumi_command as command
 import pulumi_kubernetes as k8s
 
+from kubernetes.certificate_backup import (
+    backup_certificate_secret,
+    find_certificate_backup,
+    restore_certificate_secret,
+)
 from kubernetes.config import ComponentConfig
 
 
@@ -9,6 +15,7 @@ def create_traefik(
     component_config: ComponentConfig,
     issuer: k8s.apiextensions.CustomResource,
     k8s_provider: k8s.Provider,
+    connection_args: command.remote.ConnectionArgs,
 ):
     namespace = k8s.core.v1.Namespace(
         'traefik',
@@ -59,6 +66,33 @@ def create_traefik(
     )
 
     wildcard_domain = f'*.{component_config.cloudflare.zone}'
+    certificate_depends_on: list[p.Resource] = [issuer]
+    backup_item = (
+        find_certificate_backup('certificate')
+        if component_config.cert_manager.certificate_backup
+        else None
+    )
+    if backup_item:
+        restored_secret = restore_certificate_secret(
+            'certificate',
+            backup_item,
+            'traefik',
+            {
+                'cert-manager.io/alt-names': wildcard_domain,
+                'cert-manager.io/certificate-name': 'certificate',
+                'cert-manager.io/common-name': wildcard_domain,
+                'cert-manager.io/issuer-group': 'cert-manager.io',
+                'cert-manager.io/issuer-kind': 'ClusterIssuer',
+                'cert-manager.io/issuer-name': 'lets-encrypt',
+            },
+            connection_args,
+            # a new kube config means a rebuilt cluster which lacks the secret
+            [k8s_provider.kubeconfig],  # type: ignore
+            p.ResourceOptions(depends_on=[namespace]),
+        )
+        if restored_secret:
+            certificate_depends_on.append(restored_secret)
+
     certificate = k8s.apiextensions.CustomResource(
         'certificate',
         api_version='cert-manager.io/v1',
@@ -76,9 +110,16 @@ def create_traefik(
             'dnsNames': [wildcard_domain],
             'issuerRef': {'name': 'lets-encrypt', 'kind': 'ClusterIssuer'},
         },
-        opts=p.ResourceOptions.merge(k8s_opts, p.ResourceOptions(depends_on=[issuer])),
+        opts=p.ResourceOptions.merge(
+            k8s_opts, p.ResourceOptions(depends_on=certificate_depends_on)
+        ),
     )
 
+    if component_config.cert_manager.certificate_backup:
+        backup_certificate_secret(
+            'certificate', namespace.metadata.name, certificate, backup_item, k8s_opts
+        )
+
     # use this certificate as traefik's new default:
     k8s.apiextensions.CustomResource(
         'default',
@@ -1,5 +1,8 @@
 import pulumi as p
 
+# UUID of the 1Password vault holding Pulumi managed items
+ONEPASSWORD_PULUMI_VAULT = 'mf5hvtoot2hvdylkce6hxdpqmi'
+
 
 def stack_is_prod() -> bool:
     return p.get_stack() == 'prod'
@@ -0,0 +1,97 @@
+import shutil
+
+import pulumi as p
+import pulumi.automation as auto
+import pytest
+
+from kubernetes.automation import _normalize_changes, format_summary, run_stacks
+
+
+def test_normalize_changes_preview():
+    assert _normalize_changes({auto.OpType.CREATE: 2, auto.OpType.SAME: 5}) == {
+        'create': 2,
+        'same': 5,
+    }
+
+
+def test_normalize_changes_up():
+    assert _normalize_changes({'create': 1, 'update': 3}) == {'create': 1, 'update': 3}
+
+
+def test_normalize_changes_none():
+    assert _normalize_changes(None) == {}
+
+
+def _program():
+    if p.get_stack() == 'broken':
+        raise ValueError('broken program')
+    p.export('stack', p.get_stack())
+
+
+@pytest.mark.skipif(not shutil.which('pulumi'), reason='pulumi CLI not installed')
+@pytest.mark.parametrize('operation', ['preview', 'up'])
+def test_run_stacks_file_backend(tmp_path, capsys, operation):
+    work_dir = tmp_path / 'project'
+    work_dir.mkdir()
+    (work_dir / 'Pulumi.yaml').write_text('name: automation-test\nruntime: python\n')
+    state_dir = tmp_path / 'state'
+    state_dir.mkdir()
+
+    results = run_stacks(
+        ['first', 'broken', 'second'],
+        operation,
+        work_dir,
+        parallel=2,
+        program=_program,
+        env_vars={
+            'PULUMI_BACKEND_URL': f'file://{state_dir}',
+            'PULUMI_CONFIG_PASSPHRASE': 'test',
+        },
+        create=True,
+    )
+
+    assert [result.stack for result in results] == ['first', 'broken', 'second']
+    first, broken, second = results
+
+    for result in (first, second):
+        assert result.error is None
+        # only the stack resource itself
+        assert result.changes == {'create': 1}
+        assert result.duration > 0
+
+    assert broken.error
+    assert broken.duration > 0
+
+    output = capsys.readouterr().out
+    assert '[first] ' in output
+    assert '[second] ' in output
+    assert '[broken] ' in output
+    assert 'broken program' in output
+
+    summary = format_summary(results)
+    assert 'first' in summary
+    assert 'failed' in summary
+
+
+@pytest.mark.skipif(not shutil.which('pulumi'), reason='pulumi CLI not installed')
+def test_run_stacks_does_not_create_missing_stack(tmp_path):
+    work_dir = tmp_path / 'project'
+    work_dir.mkdir()
+    (work_dir / 'Pulumi.yaml').write_text('name: automation-test\nruntime: python\n')
+    state_dir = tmp_path / 'state'
+    state_dir.mkdir()
+
+    (result,) = run_stacks(
+        ['missing'],
+        'preview',
+        work_dir,
+        parallel=1,
+        program=_program,
+        env_vars={
+            'PULUMI_BACKEND_URL': f'file://{state_dir}',
+            'PULUMI_CONFIG_PASSPHRASE': 'test',
+        },
+    )
+
+    assert result.error
+    assert not (state_dir / '.pulumi' / 'stacks' / 'automation-test' / 'missing.json').exists()
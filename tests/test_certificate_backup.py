@@ -0,0 +1,105 @@
+import json
+import os
+import subprocess
+
+import pytest
+
+from kubernetes.certificate_backup import _get_restore_script, _get_secret_manifest, _is_not_found
+
+# Stands in for `microk8s kubectl get|create`, the secret "exists" once its state file does
+FAKE_MICROK8S = """#!/bin/sh
+case "$2" in
+    get)
+        [ -f "$STATE_DIR/get-fails" ] && echo 'connection refused' >&2 && exit 1
+        [ -f "$STATE_DIR/secret" ] && echo 'secret/certificate'
+        exit 0
+        ;;
+    create)
+        cat > "$STATE_DIR/secret"
+        ;;
+esac
+"""
+
+
+@pytest.mark.parametrize(
+    'message',
+    [
+        '[ERROR] 2025/01/01 00:00:00 "Certificate test certificate" isn\'t an item in the '
+        '"Pulumi" vault. Specify the item with its UUID, name, or domain.',
+        'Found 0 item(s) in vault "mf5hvtoot2hvdylkce6hxdpqmi" with title "Certificate test"',
+    ],
+)
+def test_is_not_found_missing_item(message):
+    assert _is_not_found(Exception(message))
+
+
+@pytest.mark.parametrize(
+    'message',
+    [
+        '[ERROR] 2025/01/01 00:00:00 "mf5hvtoot2hvdylkce6hxdpqmi" isn\'t a vault in this account.',
+        'vault not found',
+        '[ERROR] 2025/01/01 00:00:00 You do not have permission to perform this action.',
+        'status 403: Authorization: token is not authorized to access vault',
+        'Found 2 item(s) in vault "mf5hvtoot2hvdylkce6hxdpqmi" with title "Certificate test"',
+        '[ERROR] 2025/01/01 00:00:00 More than one item matches "Certificate test".',
+    ],
+)
+def test_is_not_found_other_errors(message):
+    assert not _is_not_found(Exception(message))
+
+
+def _run_restore_script(tmp_path, secret: str | None = None, get_fails: bool = False):
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    microk8s = bin_dir / 'microk8s'
+    microk8s.write_text(FAKE_MICROK8S)
+    microk8s.chmod(0o755)
+    state_dir = tmp_path / 'state'
+    state_dir.mkdir()
+    if secret:
+        (state_dir / 'secret').write_text(secret)
+    if get_fails:
+        (state_dir / 'get-fails').touch()
+
+    manifest = _get_secret_manifest(
+        'certificate', 'traefik', {'cert-manager.io/certificate-name': 'certificate'}, {}
+    )
+    process = subprocess.run(
+        ['sh', '-c', _get_restore_script('certificate', 'traefik')],
+        input=json.dumps(manifest),
+        capture_output=True,
+        text=True,
+        check=False,
+        env={
+            **os.environ,
+            'PATH': f'{bin_dir}{os.pathsep}{os.environ["PATH"]}',
+            'STATE_DIR': str(state_dir),
+        },
+    )
+    return process, state_dir / 'secret'
+
+
+def test_restore_script_creates_missing_secret(tmp_path):
+    process, secret = _run_restore_script(tmp_path)
+
+    assert process.returncode == 0
+    assert json.loads(secret.read_text())['metadata'] == {
+        'name': 'certificate',
+        'namespace': 'traefik',
+        'annotations': {'cert-manager.io/certificate-name': 'certificate'},
+    }
+
+
+def test_restore_script_keeps_existing_secret(tmp_path):
+    process, secret = _run_restore_script(tmp_path, secret='renewed by cert-manager')
+
+    assert process.returncode == 0
+    assert 'exists, not restoring it' in process.stdout
+    assert secret.read_text() == 'renewed by cert-manager'
+
+
+def test_restore_script_fails_on_lookup_error(tmp_path):
+    process, secret = _run_restore_script(tmp_path, get_fails=True)
+
+    assert process.returncode != 0
+    assert not secret.exists()
@@ -0,0 +1,35 @@
+import pytest
+
+# the config models build on the shared models of deploy-base
+pytest.importorskip('deploy_base')
+
+from kubernetes.config import Dns01Config, PrometheusConfig  # noqa: E402
+
+
+def test_dns01_extra_args_default():
+    assert Dns01Config().extra_args == []
+
+
+def test_dns01_extra_args():
+    config = Dns01Config.model_validate(
+        {
+            'recursive-nameservers': ['1.1.1.1:53', '1.0.0.1:53'],
+            'recursive-nameservers-only': True,
+            'check-retry-period': '5s',
+        }
+    )
+
+    assert config.extra_args == [
+        '--dns01-recursive-nameservers=1.1.1.1:53,1.0.0.1:53',
+        '--dns01-recursive-nameservers-only',
+        '--dns01-check-retry-period=5s',
+    ]
+
+
+@pytest.mark.parametrize('storage_size', [1, 5, 15, 100])
+def test_prometheus_retention_size_below_storage_size(storage_size):
+    config = PrometheusConfig.model_validate({'version': '1.0.0', 'storage-size': storage_size})
+
+    assert config.retention_size.endswith('MB')
+    # prometheus units are powers of two just like the volume size in Gi
+    assert 0 < int(config.retention_size.removesuffix('MB')) < storage_size * 1024
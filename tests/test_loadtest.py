@@ -0,0 +1,243 @@
+import asyncio
+import json
+import socket
+
+import pytest
+
+from kubernetes.loadtest import (
+    LatencyHistogram,
+    LoadTestConfig,
+    compare_results,
+    get_config_mismatches,
+    main,
+    run_load_test,
+    start_server,
+)
+
+
+def _make_result(
+    rate: float = 1000.0,
+    p50: int = 1000,
+    p99: int = 5000,
+    requests: int = 10000,
+    errors: dict | None = None,
+    config: dict | None = None,
+) -> dict:
+    return {
+        'config': {
+            'url': 'http://127.0.0.1:8080/',
+            'duration': 10.0,
+            'concurrency': 8,
+            'rate': None,
+            'keep_alive': True,
+            'http2': False,
+            **(config or {}),
+        },
+        'requests': requests,
+        'errors': errors or {},
+        'rate': rate,
+        'latency_us': {'p50': p50, 'p99': p99},
+    }
+
+
+def _get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.mark.parametrize('value', [0, 1, 127, 128, 255, 256, 257, 1000, 12345, 10**6, 10**9])
+def test_histogram_index_value_round_trip(value):
+    index = LatencyHistogram._get_index(value)
+    bucket_value = LatencyHistogram._get_value(index)
+
+    assert LatencyHistogram._get_index(bucket_value) == index
+    assert bucket_value >= value
+    assert bucket_value - value <= value / 128
+
+
+def test_histogram_index_is_monotonic():
+    indexes = [LatencyHistogram._get_index(value) for value in range(100000)]
+    assert indexes == sorted(indexes)
+
+
+def test_histogram_worst_case_error_below_one_percent():
+    worst = max(
+        (LatencyHistogram._get_value(LatencyHistogram._get_index(value)) - value) / value
+        for value in range(1, 100000)
+    )
+    assert worst < 0.01
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for value in range(1, 1001):
+        histogram.record(value)
+
+    assert histogram.total == 1000
+    assert histogram.max == 1000
+    assert histogram.percentile(50) == pytest.approx(500, rel=0.01)
+    assert histogram.percentile(99) == pytest.approx(990, rel=0.01)
+    assert histogram.percentile(100) == 1000
+
+
+def test_histogram_empty():
+    assert LatencyHistogram().percentile(99) == 0
+
+
+def test_compare_results_no_regression():
+    baseline = _make_result()
+    assert compare_results(baseline, _make_result(rate=950, p50=1050, p99=5400), 0.1) == []
+
+
+def test_compare_results_rate_and_latency_regression():
+    regressions = compare_results(_make_result(), _make_result(rate=800, p99=6000), 0.1)
+    assert [regression.split(':')[0] for regression in regressions] == ['rate', 'p99']
+
+
+def test_compare_results_no_requests():
+    result = _make_result(requests=0, errors={'ConnectionRefusedError': 100})
+    assert compare_results(_make_result(), result, 0.1) == ['no request succeeded']
+
+
+def test_compare_results_error_ratio():
+    baseline = _make_result(errors={'TimeoutError': 1})
+    assert compare_results(baseline, _make_result(errors={'TimeoutError': 1}), 0.1) == []
+
+    regressions = compare_results(baseline, _make_result(errors={'TimeoutError': 1000}), 0.1)
+    assert len(regressions) == 1
+    assert regressions[0].startswith('error ratio')
+
+
+def test_compare_results_error_free_baseline():
+    baseline = _make_result()
+    # a single error is within the absolute tolerance
+    assert compare_results(baseline, _make_result(errors={'TimeoutError': 1}), 0.1) == []
+
+    regressions = compare_results(baseline, _make_result(errors={'TimeoutError': 100}), 0.1)
+    assert [regression.split(':')[0] for regression in regressions] == ['error ratio']
+    assert (
+        compare_results(
+            baseline, _make_result(errors={'TimeoutError': 100}), 0.1, max_error_ratio=0.02
+        )
+        == []
+    )
+
+
+def test_compare_results_rejects_baseline_without_requests():
+    baseline = _make_result(requests=0, errors={'ConnectionRefusedError': 100})
+    with pytest.raises(ValueError, match='no successful requests'):
+        compare_results(baseline, _make_result(), 0.1)
+
+
+def test_config_mismatches():
+    baseline = _make_result()
+    assert get_config_mismatches(baseline, _make_result()) == []
+    assert get_config_mismatches(baseline, _make_result(config={'rate': 500.0, 'http2': True})) == [
+        'rate: None != 500.0',
+        'http2: False != True',
+    ]
+
+
+def test_main_refuses_mismatching_baseline(tmp_path):
+    baseline_path = tmp_path / 'baseline.json'
+    baseline_path.write_text(json.dumps(_make_result()))
+    result_path = tmp_path / 'result.json'
+    result_path.write_text(json.dumps(_make_result(config={'rate': 500.0, 'concurrency': 4})))
+
+    assert main(['compare', str(baseline_path), str(result_path)]) == 2
+
+
+def test_main_refuses_baseline_without_requests(tmp_path):
+    baseline_path = tmp_path / 'baseline.json'
+    baseline_path.write_text(json.dumps(_make_result(requests=0, rate=0.0)))
+    result_path = tmp_path / 'result.json'
+    result_path.write_text(json.dumps(_make_result()))
+
+    assert main(['compare', str(baseline_path), str(result_path)]) == 2
+
+
+def test_main_fails_without_successful_requests(tmp_path):
+    output = tmp_path / 'result.json'
+    url = f'http://127.0.0.1:{_get_free_port()}/'
+
+    assert (
+        main(['run', url, '--duration', '0.5', '--concurrency', '2', '--output', str(output)]) == 1
+    )
+
+    result = json.loads(output.read_text())
+    assert result['requests'] == 0
+    # failed connects are backed off instead of retried in a tight loop
+    assert 0 < sum(result['errors'].values()) < 50
+
+
+@pytest.mark.parametrize(
+    ('rate', 'keep_alive', 'http2'),
+    [
+        (None, True, False),
+        (None, False, False),
+        (200.0, True, False),
+        (None, True, True),
+        (200.0, False, True),
+    ],
+)
+def test_run_load_test_against_local_server(rate, keep_alive, http2):
+    async def run() -> dict:
+        server = await start_server('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await run_load_test(
+                LoadTestConfig(
+                    url=f'http://127.0.0.1:{port}/path?query=1',
+                    duration=0.5,
+                    concurrency=2,
+                    rate=rate,
+                    keep_alive=keep_alive,
+                    http2=http2,
+                )
+            )
+
+    result = asyncio.run(run())
+
+    assert result['errors'] == {}
+    assert result['requests'] > 0
+    assert result['status_codes'] == {'200': result['requests']}
+    if rate:
+        assert result['requests'] == pytest.approx(rate * 0.5, abs=2)
+    assert 0 < result['latency_us']['p50'] <= result['latency_us']['p99']
+    assert result['latency_us']['p99'] <= result['latency_us']['max']
+    json.dumps(result)
+
+
+@pytest.mark.parametrize('rate', [None, 40.0])
+def test_run_load_test_against_hanging_server(rate):
+    async def handle_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # accept the request but never respond
+        await reader.read()
+        writer.close()
+
+    async def run() -> dict:
+        server = await asyncio.start_server(handle_client, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await run_load_test(
+                LoadTestConfig(
+                    url=f'http://127.0.0.1:{port}/',
+                    duration=0.5,
+                    concurrency=2,
+                    rate=rate,
+                    timeout=1.0,
+                )
+            )
+
+    result = asyncio.run(run())
+
+    # stopped once the requests sent before the end had their timeout
+    assert result['elapsed'] < 2.0
+    assert result['requests'] == 0
+    errors = result['errors']
+    assert errors['TimeoutError'] == 2
+    if rate:
+        # every scheduled request is accounted for, either as timeout, cancelled or missed
+        assert errors['Cancelled'] == 2
+        assert sum(errors.values()) == pytest.approx(rate * 0.5, abs=1)
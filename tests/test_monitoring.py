@@ -0,0 +1,81 @@
+import re
+
+import pytest
+
+# the monitoring config builds on the shared models of deploy-base
+pytest.importorskip('deploy_base')
+
+from kubernetes.monitoring import (  # noqa: E402
+    _get_dashboard,
+    _get_ingress_dashboard,
+    _get_nodes_dashboard,
+    _get_scrape_configs,
+)
+
+# Labels the exporters put on their metrics themselves, all others must come from relabeling
+METRIC_LABELS = {'le', 'code', 'entrypoint', 'service', 'mode', 'device', 'verb'}
+
+
+def _get_relabel_targets(scrape_config: dict) -> set[str]:
+    return {
+        relabel_config['target_label']
+        for relabel_config in scrape_config.get('relabel_configs', [])
+        if 'target_label' in relabel_config and not relabel_config['target_label'].startswith('__')
+    }
+
+
+def _get_query_labels(target: dict) -> set[str]:
+    labels = set()
+    for group in re.findall(r'\b(?:by|on) \(([^)]*)\)', target['expr']):
+        labels.update(label.strip() for label in group.split(','))
+    labels.update(re.findall(r'{{(\w+)}}', target['legendFormat']))
+    return labels
+
+
+def test_scrape_config_job_names_unique():
+    job_names = [scrape_config['job_name'] for scrape_config in _get_scrape_configs('monitoring')]
+
+    assert len(job_names) == len(set(job_names))
+
+
+def test_scrape_configs_label_node():
+    scrape_configs = {
+        scrape_config['job_name']: scrape_config
+        for scrape_config in _get_scrape_configs('monitoring')
+    }
+
+    # the node dashboard groups the node exporter and kubelet metrics by node
+    for job_name in ('node-exporter', 'kubernetes-nodes', 'kubernetes-nodes-cadvisor'):
+        assert 'node' in _get_relabel_targets(scrape_configs[job_name])
+
+
+@pytest.mark.parametrize('dashboard', [_get_ingress_dashboard(), _get_nodes_dashboard()])
+def test_dashboard_labels_are_scraped(dashboard):
+    relabel_targets = set().union(
+        *(
+            _get_relabel_targets(scrape_config)
+            for scrape_config in _get_scrape_configs('monitoring')
+        )
+    )
+
+    for panel in dashboard['panels']:
+        for target in panel['targets']:
+            assert _get_query_labels(target) <= relabel_targets | METRIC_LABELS, target['expr']
+
+
+def test_dashboard_layout():
+    dashboard = _get_dashboard(
+        'test',
+        'Test',
+        [('A', 's', [('up', '{{job}}')]), ('B', 's', [('up', '')]), ('C', 's', [('up', '')])],
+    )
+
+    assert [panel['id'] for panel in dashboard['panels']] == [1, 2, 3]
+    assert [(panel['gridPos']['x'], panel['gridPos']['y']) for panel in dashboard['panels']] == [
+        (0, 0),
+        (12, 0),
+        (0, 8),
+    ]
+    assert dashboard['panels'][0]['targets'] == [
+        {'refId': 'A', 'expr': 'up', 'legendFormat': '{{job}}'}
+    ]